@@ -1,27 +1,104 @@
 # -*- coding: utf-8 -*-
 
 import abc
-
-from jax import core
-from .compat_numpy import arange, array, concatenate, expand_dims, linspace, meshgrid, stack, transpose
+import functools
+import math
+import numbers
+
+import jax
+import jax.numpy as jnp
+from jax import core, config, lax
+from ._utils import _as_jax_array_
+from .ndarray import Array
 import numpy as np
 
 __all__ = ["c_", "index_exp", "mgrid", "ogrid", "r_", "s_"]
 
 
-def _make_1d_grid_from_slice(s: slice, op_name: str):
+def _slice_to_key(s: slice, op_name: str):
   start = core.concrete_or_error(None, s.start,
                                  f"slice start of jnp.{op_name}") or 0
   stop = core.concrete_or_error(None, s.stop,
                                 f"slice stop of jnp.{op_name}")
   step = core.concrete_or_error(None, s.step,
                                 f"slice step of jnp.{op_name}") or 1
-  if np.iscomplex(step):
-    newobj = linspace(start, stop, int(abs(step)))
+  # the value types are part of the key, so that ``0:4`` and ``0.:4.``
+  # are not mixed up in the caches below
+  return start, stop, step, type(start), type(stop), type(step)
+
+
+def _is_hashable(key) -> bool:
+  try:
+    hash(key)
+  except TypeError:
+    return False
+  return True
+
+
+def _grid_length(key) -> int:
+  start, stop, step = key[:3]
+  if isinstance(step, (complex, np.complexfloating)):
+    return int(abs(step))
+  if stop is None:
+    start, stop = 0, start
+  return max(math.ceil((stop - start) / step), 0)
+
+
+def _grid_1d(key):
+  start, stop, step = key[:3]
+  n = _grid_length(key)
+  if isinstance(step, (complex, np.complexfloating)):
+    return jnp.linspace(start, stop, n)
   else:
-    newobj = arange(start, stop, step)
+    if stop is None:
+      start, stop = 0, start
+    # scale a single ``iota``, rather than computing ``arange(start, stop, step)``,
+    # and skip the scaling and the offset when they are trivial, e.g. for ``0:N``
+    dtype = jnp.result_type(start, stop, step)
+    grid = lax.iota(dtype, n)
+    if step != 1:
+      grid = grid * step
+    if start != 0:
+      grid = grid + start
+    return grid
+
+
+def _index_grid(grids, sparse: bool):
+  output = jnp.meshgrid(*grids, indexing='ij', sparse=sparse)
+  # the dense grids are stacked once, as raw JAX arrays
+  return tuple(output) if sparse else jnp.stack(output, axis=0)
+
+
+# Only the 1-D grids are cached, and only those with at most this many
+# elements, i.e. at most 32 KB per entry and 4 MB for the whole cache.
+# Multi-dimensional grids are always built from the cached 1-D grids, so
+# that their dense products are never cached.
+_MAX_CACHED_GRID_SIZE = 1 << 12
+
+
+# The cache holds host-side NumPy arrays rather than device buffers, so that
+# it is not invalidated by ``brainpy.math.clear_buffer_memory()``.
+@functools.lru_cache(maxsize=128)
+def _cached_grid_1d(key, x64: bool):
+  # evaluate eagerly, so that no tracer is kept in the cache
+  with jax.ensure_compile_time_eval():
+    return np.asarray(_grid_1d(key))
+
+
+def _grid_1d_from_slice(s: slice, op_name: str):
+  key = _slice_to_key(s, op_name)
+  # Under tracing, e.g. ``jax.jit``, the grid is built from ``iota`` rather
+  # than captured as a constant, which would be baked into the program.
+  if (core.trace_state_clean()
+      and _is_hashable(key)
+      and _grid_length(key) <= _MAX_CACHED_GRID_SIZE):
+    return jnp.asarray(_cached_grid_1d(key, config.jax_enable_x64))
+  else:
+    return _grid_1d(key)
 
-  return newobj
+
+def _make_1d_grid_from_slice(s: slice, op_name: str):
+  return Array(_grid_1d_from_slice(s, op_name))
 
 
 class _IndexGrid(abc.ABC):
@@ -32,9 +109,9 @@ class _IndexGrid(abc.ABC):
   def __getitem__(self, key):
     if isinstance(key, slice):
       return _make_1d_grid_from_slice(key, op_name=self.op_name)
-    output = (_make_1d_grid_from_slice(k, op_name=self.op_name) for k in key)
-    output = meshgrid(*output, indexing='ij', sparse=self.sparse)
-    return output if self.sparse else stack(output, 0)
+    grids = [_grid_1d_from_slice(k, op_name=self.op_name) for k in key]
+    output = _index_grid(grids, self.sparse)
+    return [Array(o) for o in output] if self.sparse else Array(output)
 
 
 class _Mgrid(_IndexGrid):
@@ -107,72 +184,146 @@ class _Ogrid(_IndexGrid):
 ogrid = _Ogrid()
 
 
+@functools.lru_cache(maxsize=128)
+def _parse_directive(directive: str, axis: int, ndmin: int, trans1d: int):
+  # directives are literal strings, so they are parsed only once
+  params = [axis, ndmin, trans1d, -1]
+  # check two special cases: matrix directives
+  if directive == "r":
+    params[-1] = 0
+  elif directive == "c":
+    params[-1] = 1
+  else:
+    vec = directive.split(",")
+    k = len(vec)
+    if k < 4:
+      vec += params[k:]
+    else:
+      # ignore everything after the first three comma-separated ints
+      vec = vec[:3] + params[-1:]
+    try:
+      params = list(map(int, vec))
+    except ValueError as err:
+      raise ValueError(
+        "could not understand directive {!r}".format(directive)
+      ) from err
+  return tuple(params)
+
+
+@functools.lru_cache(maxsize=128)
+def _trans1d_permutation(ndmin: int, trans1d: int):
+  # The upgraded axes are cyclically shifted to the left. Returns ``None``
+  # when the shift is the identity, so that no transpose is needed.
+  shape_obj = list(range(ndmin))
+  # Calculate number of left shifts, with overflow protection by mod
+  num_lshifts = ndmin - abs(ndmin + trans1d + 1) % ndmin
+  shape_obj = tuple(shape_obj[num_lshifts:] + shape_obj[:num_lshifts])
+  return None if shape_obj == tuple(range(ndmin)) else shape_obj
+
+
+def _promote(newobj, ndim: int, ndmin: int, perm):
+  newobj = jnp.array(newobj, copy=False, ndmin=ndmin)
+  if perm is not None and ndmin - ndim > 0:
+    newobj = jnp.transpose(newobj, perm)
+  return newobj
+
+
+def _as_matrix(res, matrix: int):
+  if matrix != -1 and res.ndim == 1:
+    # insert 2nd dim at axis 0 or 1
+    res = jnp.expand_dims(res, matrix)
+  return res
+
+
+def _concatenate(output, axis: int, matrix: int):
+  return _as_matrix(jnp.concatenate(output, axis=axis), matrix)
+
+
+def _is_scalar(item) -> bool:
+  if isinstance(item, str):
+    return False
+  return isinstance(item, numbers.Number) or getattr(item, 'ndim', None) == 0
+
+
+@functools.lru_cache(maxsize=128)
+def _jitted_concat(axis: int, ndmin: int, trans1d: int, matrix: int):
+  # ``jax.jit`` caches the traced function by the shapes and dtypes of the
+  # arrays, while this cache keeps one jitted function per directive
+  perm = None if trans1d == -1 else _trans1d_permutation(ndmin, trans1d)
+
+  def concat(*arrays):
+    # arrays which need no promotion are concatenated as they are
+    output = [a if a.ndim >= ndmin else _promote(a, a.ndim, ndmin, perm) for a in arrays]
+    return _concatenate(output, axis, matrix)
+
+  return jax.jit(concat)
+
+
+@functools.lru_cache(maxsize=128)
+def _jitted_stack(axis: int, ndmin: int, matrix: int):
+  def stack(*scalars):
+    # ``stack`` keeps the weak type of Python scalars, as ``concatenate`` does
+    res = jnp.stack(scalars)
+    if ndmin > 1:
+      shape = [1] * ndmin
+      shape[axis] = len(scalars)
+      res = res.reshape(shape)
+    return _as_matrix(res, matrix)
+
+  return jax.jit(stack)
+
+
 class _AxisConcat(abc.ABC):
   """Concatenates slices, scalars and array-like objects along a given axis."""
   axis: int
   ndmin: int
   trans1d: int
   op_name: str
+  # ``(axis, ndmin, trans1d, matrix)`` used when no directive is given
+  _DEFAULT_PARAMS: tuple
 
   def __getitem__(self, key):
     if not isinstance(key, tuple):
       key = (key,)
 
-    params = [self.axis, self.ndmin, self.trans1d, -1]
+    if len(key) == 1 and isinstance(key[0], slice) and self.ndmin <= 1:
+      # a single 1-D grid, e.g. ``r_[0:N]``, needs no promotion or concatenation
+      return _make_1d_grid_from_slice(key[0], op_name=self.op_name)
 
     if isinstance(key[0], str):
       # split off the directive
       directive, *key = key  # pytype: disable=bad-unpacking
-      # check two special cases: matrix directives
-      if directive == "r":
-        params[-1] = 0
-      elif directive == "c":
-        params[-1] = 1
-      else:
-        vec = directive.split(",")
-        k = len(vec)
-        if k < 4:
-          vec += params[k:]
-        else:
-          # ignore everything after the first three comma-separated ints
-          vec = vec[:3] + params[-1]
-        try:
-          params = list(map(int, vec))
-        except ValueError as err:
-          raise ValueError(
-            "could not understand directive {!r}".format(directive)
-          ) from err
-
-    axis, ndmin, trans1d, matrix = params
-
+      axis, ndmin, trans1d, matrix = _parse_directive(directive, self.axis, self.ndmin, self.trans1d)
+    else:
+      axis, ndmin, trans1d, matrix = self._DEFAULT_PARAMS
+
+    if all(hasattr(item, 'shape') and hasattr(item, 'dtype') and not isinstance(item, str) for item in key):
+      # arrays only, whose concatenation is traced once per directive and signature
+      res = _jitted_concat(axis, ndmin, trans1d, matrix)(*[_as_jax_array_(item) for item in key])
+      return Array(res)
+
+    if ndmin >= 1 and -ndmin <= axis < ndmin and len(key) and all(_is_scalar(item) for item in key):
+      items = [_as_jax_array_(item) for item in key]
+      if not any(isinstance(item, core.Tracer) for item in items):
+        # concrete scalars, e.g. ``r_[1, 2, 3]``, are gathered into a single
+        # constant, even under ``jax.jit``, by one call of a jitted ``stack``
+        with jax.ensure_compile_time_eval():
+          res = _jitted_stack(axis, ndmin, matrix)(*items)
+        return Array(res)
+
+    # all items are promoted as raw JAX arrays, and only the
+    # result of the final concatenation is wrapped as an Array
+    perm = None if trans1d == -1 else _trans1d_permutation(ndmin, trans1d)
     output = []
     for item in key:
       if isinstance(item, slice):
-        newobj = _make_1d_grid_from_slice(item, op_name=self.op_name)
+        newobj = _grid_1d_from_slice(item, op_name=self.op_name)
       elif isinstance(item, str):
         raise ValueError("string directive must be placed at the beginning")
       else:
-        newobj = item
-
-      newobj = array(newobj, copy=False, ndmin=ndmin)
-
-      if trans1d != -1 and ndmin - np.ndim(item) > 0:
-        shape_obj = list(range(ndmin))
-        # Calculate number of left shifts, with overflow protection by mod
-        num_lshifts = ndmin - abs(ndmin + trans1d + 1) % ndmin
-        shape_obj = tuple(shape_obj[num_lshifts:] + shape_obj[:num_lshifts])
-
-        newobj = transpose(newobj, shape_obj)
-
-      output.append(newobj)
-
-    res = concatenate(tuple(output), axis=axis)
-
-    if matrix != -1 and res.ndim == 1:
-      # insert 2nd dim at axis 0 or 1
-      res = expand_dims(res, matrix)
-
-    return res
+        newobj = _as_jax_array_(item)
+      output.append(_promote(newobj, np.ndim(item), ndmin, perm))
+    return Array(_concatenate(output, axis, matrix))
 
   def __len__(self):
     return 0
@@ -248,6 +399,7 @@ class RClass(_AxisConcat):
   ndmin = 1
   trans1d = -1
   op_name = "r_"
+  _DEFAULT_PARAMS = (axis, ndmin, trans1d, -1)
 
 
 r_ = RClass()
@@ -296,6 +448,7 @@ class CClass(_AxisConcat):
   ndmin = 2
   trans1d = 0
   op_name = "c_"
+  _DEFAULT_PARAMS = (axis, ndmin, trans1d, -1)
 
 
 c_ = CClass()
@@ -1,6 +1,9 @@
 import jax.core
-import brainpy.math as bm
+import jax.numpy as jnp
 import numba
+import numpy as np
+
+import brainpy.math as bm
 
 
 @numba.njit(fastmath=True)
@@ -29,3 +32,36 @@ def test_event_ELL():
   bm.clear_buffer_memory()
 
 
+@numba.njit(fastmath=True, parallel=True, nogil=True)
+def numba_event_ell_parallel(weight, indices, active, outs):
+  # each thread scatters its share of the active rows into a private
+  # buffer, and the buffers are summed afterwards, so that no update races
+  weight = weight[()]  # 0d
+  num_threads = numba.get_num_threads()
+  partial_outs = np.zeros((num_threads, outs.shape[0]), dtype=outs.dtype)
+  for t in numba.prange(num_threads):
+    for k in range(t, active.shape[0], num_threads):
+      for j in indices[active[k]]:
+        partial_outs[t, j] += weight
+  outs[:] = partial_outs.sum(axis=0)
+
+
+prim_parallel = bm.XLACustomOp(numba_event_ell_parallel)
+
+
+def call_parallel(s=100):
+  indices = bm.random.randint(0, s, (s, 80))
+  vector = bm.random.rand(s) < 0.1
+  active = jnp.flatnonzero(bm.as_jax(vector)).astype(jnp.int32)
+  out = prim_parallel(1., indices, active, outs=[jax.ShapeDtypeStruct([s], dtype=bm.float32)])
+  expected = np.zeros(s, dtype=np.float32)
+  np.add.at(expected, np.asarray(indices)[np.asarray(vector)].ravel(), 1.)
+  assert np.allclose(out[0], expected)
+
+
+def test_event_ELL_parallel():
+  call_parallel(1000)
+  call_parallel(100)
+  bm.clear_buffer_memory()
+
+
@@ -1,5 +1,6 @@
 import jax
 import jax.numpy as jnp
+import numpy as np
 import taichi as taichi
 import pytest
 import platform
@@ -25,44 +26,118 @@ if not platform.platform().startswith('Windows'):
 #       for j in range(num_cols):
 #         out[indices[i, j]] += weight_0
 
-@taichi.func
-def get_weight(weight: taichi.types.ndarray(ndim=1)) -> taichi.f32:
-  return weight[0]
-
-
-@taichi.func
-def update_output(out: taichi.types.ndarray(ndim=1), index: taichi.i32, weight_val: taichi.f32):
-  out[index] += weight_val
-
-
 @taichi.kernel
 def event_ell_cpu(indices: taichi.types.ndarray(ndim=2),
-                  vector: taichi.types.ndarray(ndim=1),
+                  active: taichi.types.ndarray(ndim=1),
                   weight: taichi.types.ndarray(ndim=1),
                   out: taichi.types.ndarray(ndim=1)):
-  weight_val = get_weight(weight)
-  num_rows, num_cols = indices.shape
-  taichi.loop_config(serialize=True)
+  # "indices" is column-major, with the shape of (num_cols, num_rows),
+  # and "active" holds the rows whose event is true
+  for i in range(out.shape[0]):
+    out[i] = 0.
+  weight_val = weight[0]
+  num_cols = indices.shape[0]
+  num_active = active.shape[0]
+  # columns are processed in parallel, so updates of ``out`` are atomic
+  taichi.loop_config(block_dim=64)
+  for j in range(num_cols):
+    for k in range(num_active):
+      taichi.atomic_add(out[indices[j, active[k]]], weight_val)
+
+
+@taichi.kernel
+def event_ell_rand_cpu(indices: taichi.types.ndarray(ndim=2),
+                       rand: taichi.types.ndarray(ndim=1),
+                       threshold: taichi.types.ndarray(ndim=1),
+                       weight: taichi.types.ndarray(ndim=1),
+                       out: taichi.types.ndarray(ndim=1)):
+  # the events are "rand < threshold", evaluated inside the kernel
+  # rather than materialized as a boolean vector beforehand
+  for i in range(out.shape[0]):
+    out[i] = 0.
+  weight_val = weight[0]
+  threshold_val = threshold[0]
+  num_cols, num_rows = indices.shape
+  # rows are processed in parallel, and each row tests its event only once
+  taichi.loop_config(block_dim=64)
   for i in range(num_rows):
-    if vector[i]:
+    if rand[i] < threshold_val:
       for j in range(num_cols):
-        update_output(out, indices[i, j], weight_val)
+        taichi.atomic_add(out[indices[j, i]], weight_val)
+
+
+@taichi.kernel
+def event_ell_count_cpu(indices: taichi.types.ndarray(ndim=2),
+                        active: taichi.types.ndarray(ndim=1),
+                        out: taichi.types.ndarray(dtype=taichi.i16, ndim=1)):
+  # all events share the same weight, so only the number of events of each
+  # target is accumulated, with int16, and the weight is applied afterwards
+  for i in range(out.shape[0]):
+    out[i] = 0
+  num_cols = indices.shape[0]
+  num_active = active.shape[0]
+  taichi.loop_config(block_dim=64)
+  for j in range(num_cols):
+    for k in range(num_active):
+      taichi.atomic_add(out[indices[j, active[k]]], taichi.i16(1))
 
 
 prim = bm.XLACustomOp(cpu_kernel=event_ell_cpu)
+prim_rand = bm.XLACustomOp(cpu_kernel=event_ell_rand_cpu)
+prim_count = bm.XLACustomOp(cpu_kernel=event_ell_count_cpu)
+
+
+def event_ell_reference(indices, vector, weight):
+  # "indices" is column-major, so the targets of row "i" are "indices[:, i]"
+  indices = np.asarray(indices).T
+  out = np.zeros(indices.shape[0], dtype=np.float32)
+  np.add.at(out, indices[np.asarray(vector)].ravel(), weight)
+  return out
 
 
 def test_taichi_op_register():
   s = 1000
-  indices = bm.random.randint(0, s, (s, 1000))
+  indices = bm.random.randint(0, s, (80, s))
   vector = bm.random.rand(s) < 0.1
-  weight = bm.array([1.0])
+  active = jnp.flatnonzero(bm.as_jax(vector)).astype(jnp.int32)
+  weight = bm.array([1.5])
+  expected = event_ell_reference(indices, vector, 1.5)
+
+  out = prim(indices, active, weight, outs=[jax.ShapeDtypeStruct((s,), dtype=jnp.float32)])
+  np.testing.assert_allclose(out[0], expected)
 
-  out = prim(indices, vector, weight, outs=[jax.ShapeDtypeStruct((s,), dtype=jnp.float32)])
+  out = prim(indices, active, weight, outs=[jax.ShapeDtypeStruct((s,), dtype=jnp.float32)])
+  np.testing.assert_allclose(out[0], expected)
+
+  bm.clear_buffer_memory()
+
+
+def test_taichi_op_register_with_threshold():
+  s = 1000
+  indices = bm.random.randint(0, s, (80, s))
+  rand = bm.random.rand(s)
+  threshold = bm.array([0.1])
+  weight = bm.array([1.5])
+  expected = event_ell_reference(indices, np.asarray(rand) < np.float32(0.1), 1.5)
+
+  out = prim_rand(indices, rand, threshold, weight, outs=[jax.ShapeDtypeStruct((s,), dtype=jnp.float32)])
+  np.testing.assert_allclose(out[0], expected)
+
+  bm.clear_buffer_memory()
+
+
+def test_taichi_op_register_with_int16_counts():
+  s = 1000
+  indices = bm.random.randint(0, s, (80, s))
+  vector = bm.random.rand(s) < 0.1
+  active = jnp.flatnonzero(bm.as_jax(vector)).astype(jnp.int32)
+  weight = bm.array([1.5])
 
-  out = prim(indices, vector, weight, outs=[jax.ShapeDtypeStruct((s,), dtype=jnp.float32)])
+  counts = prim_count(indices, active, outs=[jax.ShapeDtypeStruct((s,), dtype=jnp.int16)])[0]
+  assert counts.dtype == jnp.int16
+  np.testing.assert_array_equal(counts, event_ell_reference(indices, vector, 1).astype(np.int16))
+  np.testing.assert_allclose(counts * weight, event_ell_reference(indices, vector, 1.5))
 
-  print(out)
   bm.clear_buffer_memory()
 
 # test_taichi_op_register()
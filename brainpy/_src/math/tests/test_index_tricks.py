@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+
+import unittest
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import brainpy.math as bm
+from brainpy._src.math.index_tricks import c_, mgrid, ogrid, r_
+
+
+class TestIndexGrid(unittest.TestCase):
+  def test_mgrid(self):
+    np.testing.assert_array_equal(mgrid[:4], np.mgrid[:4])
+    np.testing.assert_array_equal(mgrid[1:4:2], np.mgrid[1:4:2])
+    np.testing.assert_array_equal(mgrid[:3, :2], np.mgrid[:3, :2])
+    np.testing.assert_array_equal(mgrid[1:5:3, :5], np.mgrid[1:5:3, :5])
+    np.testing.assert_allclose(mgrid[-1:1:5j], np.mgrid[-1:1:5j], atol=1e-6)
+    np.testing.assert_allclose(mgrid[1.3:4.2:0.3], np.mgrid[1.3:4.2:0.3], atol=1e-6)
+    np.testing.assert_allclose(mgrid[0:1:np.complex64(3j)], np.mgrid[0:1:3j], atol=1e-6)
+
+  def test_ogrid(self):
+    for a, b in zip(ogrid[:3, 1:6:2], np.ogrid[:3, 1:6:2]):
+      np.testing.assert_array_equal(a, b)
+
+  def test_cache(self):
+    a = mgrid[0:4, 0:5]
+    b = mgrid[0:4, 0:5]
+    self.assertIsNot(a, b)
+    np.testing.assert_array_equal(a, b)
+    # int and float slices give different dtypes
+    self.assertNotEqual(mgrid[0:4].dtype, mgrid[0.:4.].dtype)
+
+  def test_cache_after_clear_buffer_memory(self):
+    mgrid[0:4, 0:3]
+    r_[0:5]
+    bm.clear_buffer_memory()
+    np.testing.assert_array_equal(mgrid[0:4, 0:3], np.mgrid[0:4, 0:3])
+    np.testing.assert_array_equal(r_[0:5], np.r_[0:5])
+
+  def test_large_grid(self):
+    np.testing.assert_array_equal(mgrid[:300, :300], np.mgrid[:300, :300])
+
+  def test_jit(self):
+    np.testing.assert_array_equal(jax.jit(lambda: mgrid[:4, :2])(), np.mgrid[:4, :2])
+    with self.assertRaises(jax.core.ConcretizationTypeError):
+      jax.jit(lambda a, b: mgrid[a:b])(0, 2)
+
+  def test_no_constant_under_jit(self):
+    mgrid[:128, :256]
+    ogrid[:128, :256]
+    # the cached grids are not captured as constants when tracing
+    self.assertEqual(jax.make_jaxpr(lambda: mgrid[:128, :256].value)().consts, [])
+    self.assertEqual(jax.make_jaxpr(lambda: ogrid[:128, :256][0].value)().consts, [])
+    hlo = jax.jit(lambda x: mgrid[:128, :256].value.sum() + x).lower(1.).as_text()
+    self.assertLess(len(hlo), 10000)
+
+  def test_iota(self):
+    def primitives(f):
+      return [eqn.primitive.name for eqn in jax.make_jaxpr(f)().eqns]
+
+    self.assertEqual(primitives(lambda: r_[0:5].value), ['iota'])
+    self.assertEqual(primitives(lambda: mgrid[:5].value), ['iota'])
+    self.assertEqual(primitives(lambda: r_[2:11:3].value), ['iota', 'mul', 'add'])
+
+
+class TestAxisConcat(unittest.TestCase):
+  def test_r_(self):
+    np.testing.assert_array_equal(r_[-1:5:1, 0, 0, bm.array([1, 2, 3])],
+                                  np.r_[-1:5:1, 0, 0, np.array([1, 2, 3])])
+    np.testing.assert_allclose(r_[-1:1:6j, 0, [1, 2, 3]], np.r_[-1:1:6j, 0, [1, 2, 3]], atol=1e-6)
+    np.testing.assert_array_equal(r_['0,2', [1, 2, 3], [4, 5, 6]], np.r_['0,2', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(r_['0,2,0', [1, 2, 3], [4, 5, 6]], np.r_['0,2,0', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(r_['0,2,-2', [1, 2, 3], [4, 5, 6]], np.r_['0,2,-2', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(r_['r', [1, 2, 3], [4, 5, 6]], np.r_['r', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(r_['c', [1, 2, 3], [4, 5, 6]], np.r_['c', [1, 2, 3], [4, 5, 6]])
+
+  def test_single_slice(self):
+    np.testing.assert_array_equal(r_[0:5], np.r_[0:5])
+    np.testing.assert_allclose(r_[0:1:5j], np.r_[0:1:5j], atol=1e-6)
+    np.testing.assert_array_equal(c_[0:5], np.c_[0:5])
+
+  def test_c_(self):
+    a = np.arange(6).reshape((2, 3))
+    np.testing.assert_array_equal(c_[a, a], np.c_[a, a])
+    np.testing.assert_array_equal(c_[bm.asarray(a), 1:3], np.c_[a, 1:3])
+    np.testing.assert_array_equal(c_['0,2', [1, 2, 3], [4, 5, 6]], np.c_['0,2', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(c_['0,2,-1', [1, 2, 3], [4, 5, 6]], np.c_['0,2,-1', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(c_['r', [1, 2, 3], [4, 5, 6]], np.c_['r', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(c_[[1, 2, 3], [4, 5, 6]], np.c_[[1, 2, 3], [4, 5, 6]])
+
+  def test_jit(self):
+    f = jax.jit(lambda x, y: r_[x, 0:2, y])
+    np.testing.assert_array_equal(f(np.ones(3), np.zeros(2)), np.r_[np.ones(3), 0:2, np.zeros(2)])
+    f = jax.jit(lambda x, y: c_[x, y])
+    np.testing.assert_array_equal(f(np.ones(3), np.zeros(3)), np.c_[np.ones(3), np.zeros(3)])
+
+  def test_arrays(self):
+    a = np.arange(6).reshape((2, 3))
+    for _ in range(2):
+      np.testing.assert_array_equal(c_['r', bm.asarray(a[0]), a[1]], np.c_['r', a[0], a[1]])
+      np.testing.assert_array_equal(r_['1,2,0', bm.asarray(a[0]), a[1]], np.r_['1,2,0', a[0], a[1]])
+    np.testing.assert_array_equal(r_[np.ones(2), np.ones(3)], np.r_[np.ones(2), np.ones(3)])
+
+  def test_scalars(self):
+    np.testing.assert_array_equal(r_[1, 2, 3], np.r_[1, 2, 3])
+    np.testing.assert_allclose(r_[1, 2.5, True, np.float32(4)], np.r_[1, 2.5, True, np.float32(4)])
+    np.testing.assert_array_equal(c_[1, 2, 3], np.c_[1, 2, 3])
+    np.testing.assert_array_equal(r_['0,2', 1, 2], np.r_['0,2', 1, 2])
+    np.testing.assert_array_equal(r_['c', 1, 2], np.r_['c', 1, 2])
+    np.testing.assert_array_equal(jax.jit(lambda x: r_[x, 1, 2])(0), np.r_[0, 1, 2])
+    # Python scalars stay weakly typed
+    self.assertTrue(r_[1, 2, 3].value.weak_type)
+    self.assertTrue(c_['r', 1, 2].value.weak_type)
+    self.assertFalse(r_[np.float32(1), 2].value.weak_type)
+    self.assertEqual((jnp.ones(3, jnp.int8) + r_[1, 2, 3]).dtype, jnp.int8)
+    self.assertEqual((jnp.ones(2, jnp.float16) * r_[1., 2.]).dtype, jnp.float16)
+    self.assertEqual((jnp.ones((1, 3), jnp.int8) + c_[1, 2, 3]).dtype, jnp.int8)
+
+  def test_scalars_jaxpr(self):
+    # concrete scalars become a single constant
+    for f in [lambda: r_[1, 2, 3].value, lambda: c_['r', 1, 2].value]:
+      jaxpr = jax.make_jaxpr(f)()
+      self.assertEqual(jaxpr.eqns, [])
+      self.assertEqual(len(jaxpr.consts), 1)
+    # traced scalars need at most one op per item, plus the concatenation
+    jaxpr = jax.make_jaxpr(lambda x: r_[x, 1, 2, 3].value)(1)
+    self.assertLessEqual(len(jaxpr.eqns), 5)
+    self.assertEqual(jaxpr.eqns[-1].primitive.name, 'concatenate')
+    self.assertTrue(jaxpr.out_avals[0].weak_type)
+
+  def test_directive(self):
+    for _ in range(2):
+      np.testing.assert_array_equal(r_['1,2,0', [1, 2, 3], [4, 5, 6]], np.r_['1,2,0', [1, 2, 3], [4, 5, 6]])
+    np.testing.assert_array_equal(r_['0,2,0,5', [1, 2, 3], [4, 5, 6]], np.r_['0,2,0', [1, 2, 3], [4, 5, 6]])
+
+  def test_invalid_directive(self):
+    with self.assertRaises(ValueError):
+      r_['a,b', [1, 2, 3]]
+    with self.assertRaises(ValueError):
+      r_[[1, 2, 3], '0,2']
+    with self.assertRaises(ValueError):
+      r_[np.ones(3), np.str_('0,2')]